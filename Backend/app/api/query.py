@@ -1,9 +1,10 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import numpy as np
 from app.embedder import load_index_and_chunks
 from app.services.query_processor import QueryProcessor
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,88 +30,148 @@ class QueryResponse(BaseModel):
     processed_query: str
     results: List[SearchResult]
     total_matches: int
-    theme_summary: str = None
+    theme_summary: Optional[str] = None
     results_table: list = []
 
-@router.post("/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
-    try:
-        # Load index and chunks
-        index, chunks = load_index_and_chunks()
-        if index is None or chunks is None:
-            raise HTTPException(
-                status_code=400, 
-                detail="No indexed documents found. Upload files first."
-            )
-
-        # Preprocess and expand query
-        processed_query = query_processor.preprocess_query(request.query)
-        query_variations = query_processor.expand_query(request.query)
-        
-        # Get initial results from FAISS
-        all_results = []
-        for query_var in query_variations:
-            query_embedding = query_processor.model.encode([query_var])[0]
-            D, I = index.search(np.array([query_embedding]), request.top_k)
-            
-            # Process results
-            results = query_processor.process_search_results(
-                query=query_var,
-                chunks=chunks,
-                distances=D[0].tolist(),
-                indices=I[0].tolist(),
-                top_k=request.top_k
-            )
-            all_results.extend(results)
-
-        # Remove duplicates and filter by relevance
-        seen_positions = set()
-        filtered_results = []
-        for result in sorted(all_results, key=lambda x: x["relevance_score"], reverse=True):
-            if (result["position"] not in seen_positions and 
-                result["relevance_score"] >= request.min_relevance_score):
-                seen_positions.add(result["position"])
-                filtered_results.append(result)
-                if len(filtered_results) >= request.top_k:
-                    break
-
-        # Convert to response model
-        search_results = [
-            SearchResult(
-                chunk=result["chunk"],
-                context=result["context"] if request.include_context else "",
-                relevance_score=result["relevance_score"],
-                distance=result["distance"],
-                position=result["position"]
-            )
-            for result in filtered_results
-        ]
-
-        # Theme synthesis: use top 15 filtered results (or fewer if not enough)
+# Query variations this similar to an earlier one are skipped: they
+# would retrieve essentially the same chunks again
+VARIATION_SIM_THRESHOLD = 0.97
+
+def drop_duplicate_variations(query_variations, query_embeddings):
+    """Drop variations whose embeddings near-duplicate an earlier one"""
+    if len(query_variations) < 2:
+        return query_variations, query_embeddings
+
+    # Embeddings are unit-normalized, so the matmul gives cosine similarity
+    sim = query_embeddings @ query_embeddings.T
+    keep = [0]
+    for i in range(1, len(query_variations)):
+        if sim[i, keep].max() < VARIATION_SIM_THRESHOLD:
+            keep.append(i)
+
+    if len(keep) == len(query_variations):
+        return query_variations, query_embeddings
+
+    logger.info(
+        f"Dropped {len(query_variations) - len(keep)} near-duplicate query variations"
+    )
+    return [query_variations[i] for i in keep], query_embeddings[keep]
+
+def select_top_results(all_results, min_score, top_k):
+    """Pick the top_k highest-scoring results, deduplicated by chunk position"""
+    if not all_results:
+        return []
+
+    # Work on flat arrays instead of sorting/deduping Python dicts
+    scores = np.fromiter(
+        (r["relevance_score"] for r in all_results), dtype=np.float32, count=len(all_results)
+    )
+    positions = np.fromiter(
+        (r["position"] for r in all_results), dtype=np.int64, count=len(all_results)
+    )
+
+    order = np.argsort(-scores, kind="stable")
+    seen = np.zeros(max(int(positions.max()) + 1, 1), dtype=bool)
+
+    selected = []
+    for i in order:
+        if scores[i] < min_score:
+            break
+        pos = positions[i]
+        if not seen[pos]:
+            seen[pos] = True
+            selected.append(all_results[i])
+            if len(selected) >= top_k:
+                break
+    return selected
+
+async def run_query(request: QueryRequest, want_themes: bool = True) -> QueryResponse:
+    """Shared search pipeline behind /query and /query_results"""
+    # Load index and chunks
+    index, chunks = load_index_and_chunks()
+    if index is None or chunks is None:
+        raise HTTPException(
+            status_code=400,
+            detail="No indexed documents found. Upload files first."
+        )
+
+    # Preprocess and expand query
+    processed_query = query_processor.preprocess_query(request.query)
+    query_variations = await query_processor.expand_query(request.query)
+    
+    # Embed all query variations in one batch (cached for repeats,
+    # coalesced with concurrent requests) and search FAISS once
+    query_embeddings = await query_processor.encode_queries_batched(
+        query_variations
+    )
+    query_variations, query_embeddings = drop_duplicate_variations(
+        query_variations, query_embeddings
+    )
+    D, I = await asyncio.to_thread(index.search, query_embeddings, request.top_k)
+
+    # Process results for each variation
+    all_results = []
+    for row_idx, query_var in enumerate(query_variations):
+        results = await asyncio.to_thread(
+            query_processor.process_search_results,
+            query=query_var,
+            chunks=chunks,
+            distances=D[row_idx].tolist(),
+            indices=I[row_idx].tolist(),
+            top_k=request.top_k
+        )
+        all_results.extend(results)
+
+    # Remove duplicates and filter by relevance
+    filtered_results = select_top_results(
+        all_results, request.min_relevance_score, request.top_k
+    )
+
+    # Convert to response model
+    search_results = [
+        SearchResult(
+            chunk=result["chunk"],
+            context=result["context"] if request.include_context else "",
+            relevance_score=result["relevance_score"],
+            distance=result["distance"],
+            position=result["position"]
+        )
+        for result in filtered_results
+    ]
+
+    # Theme synthesis: use top 15 filtered results (or fewer if not enough)
+    theme_summary = None
+    if want_themes:
         top_chunk_indices = [result["position"] for result in filtered_results[:15]]
         top_chunks = [chunks[idx] for idx in top_chunk_indices]
-        theme_summary = query_processor.synthesize_themes(request.query, top_chunks) if top_chunks else "No relevant themes found."
-
-        # Build results_table for tabular display
-        results_table = []
-        for result in filtered_results:
-            idx = result["position"]
-            chunk = chunks[idx]
-            results_table.append({
-                "doc_id": chunk["document"],
-                "extracted_text": chunk["chunk_text"][:300] + ("..." if len(chunk["chunk_text"]) > 300 else ""),
-                "citation": f"Page {chunk['page']}, Para {chunk['paragraph']}, Sent {chunk['sentence']}"
-            })
-
-        return QueryResponse(
-            query=request.query,
-            processed_query=processed_query,
-            results=search_results,
-            total_matches=len(filtered_results),
-            theme_summary=theme_summary,
-            results_table=results_table
-        )
+        theme_summary = await query_processor.synthesize_themes(request.query, top_chunks) if top_chunks else "No relevant themes found."
+
+    # Build results_table for tabular display
+    results_table = []
+    for result in filtered_results:
+        idx = result["position"]
+        chunk = chunks[idx]
+        results_table.append({
+            "doc_id": chunk["document"],
+            "extracted_text": chunk["preview"],
+            "citation": chunk["citation"]
+        })
+
+    return QueryResponse(
+        query=request.query,
+        processed_query=processed_query,
+        results=search_results,
+        total_matches=len(filtered_results),
+        theme_summary=theme_summary,
+        results_table=results_table
+    )
 
+@router.post("/query", response_model=QueryResponse)
+async def query_documents(request: QueryRequest):
+    try:
+        return await run_query(request)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(
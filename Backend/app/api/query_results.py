@@ -1,54 +1,37 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import numpy as np
-from app.embedder import load_index_and_chunks
-from sentence_transformers import SentenceTransformer
+from app.api.query import QueryRequest, run_query
+import logging
 
-router = APIRouter()
-
-model = SentenceTransformer('all-MiniLM-L6-v2')
+logger = logging.getLogger(__name__)
 
-class QueryRequest(BaseModel):
-    query: str
-    top_k: int = 5  # number of chunks to retrieve
+router = APIRouter()
 
 @router.post("/query_results")
 async def query_documents_formatted(request: QueryRequest):
-    index, chunks = load_index_and_chunks()
-    if index is None or chunks is None:
-        raise HTTPException(status_code=400, detail="No indexed documents found. Upload files first.")
-
-    query_embedding = model.encode([request.query])[0]
-    D, I = index.search(np.array([query_embedding]), request.top_k)
-
-    results_table = []
-    for rank, idx in enumerate(I[0]):
-        if idx >= len(chunks):
-            continue
-    #     Retrieve the chunk and its citation information
-        chunk = chunks[idx]
-        citation = {
-        "document": chunk["document"],
-        "page": chunk["page"],
-        "paragraph": chunk["paragraph"],
-        "sentence": chunk["sentence"]
+    """Run the shared search pipeline and reshape the results table"""
+    try:
+        response = await run_query(request, want_themes=False)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing query: {str(e)}"
+        )
+
+    # Format for the results table
+    results_table = [
+        {
+            "Document": row["doc_id"],
+            "Extracted Answer": row["extracted_text"],
+            "Citation": row["citation"]
         }
-        # Format for the results table
-        results_table.append({
-        "Document": citation["document"],
-        "Extracted Answer": chunk["chunk_text"][:300] + ("..." if len(chunk["chunk_text"]) > 300 else ""),
-        "Citation": f"Page {citation['page']}, Para {citation['paragraph']}, Sent {citation['sentence']}"
-        })
-
-
-    # Placeholder synthesized theme summary (replace with your LLM or logic)
-    synthesized_themes = {
-        "Theme 1 – Regulatory Non-Compliance": "DOC001, DOC002: Highlight regulatory non-compliance with SEBI Act and LODR.",
-        "Theme 2 – Penalty Justification": "DOC001: Explicit justification of penalties under statutory frameworks."
-    }
+        for row in response.results_table
+    ]
 
     return {
         "query": request.query,
         "results_table": results_table,
-        "synthesized_theme_summary": synthesized_themes
+        "synthesized_theme_summary": {}
     }
@@ -1,9 +1,11 @@
+import asyncio
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.ocr import extract_text_from_file
 from app.chunker import chunk_text
-from app.embedder import save_index, create_faiss_index
+from app.embedder import add_to_index
 import PyPDF2
 from typing import List
 import logging
@@ -26,6 +28,31 @@ class FileProcessingError(Exception):
     """Custom exception for file processing errors"""
     pass
 
+# PDFs with at least this many pages are extracted in parallel workers
+PARALLEL_PDF_THRESHOLD = 20
+
+def _extract_pdf_page(args) -> str:
+    """Extract text from a single PDF page (top-level so it pickles for workers)"""
+    path, page_num = args
+    reader = PyPDF2.PdfReader(path)
+    return reader.pages[page_num].extract_text() or ""
+
+def extract_pdf_text(file_location: str) -> str:
+    """Extract text from all pages of a PDF, in parallel for large files"""
+    with open(file_location, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        num_pages = len(reader.pages)
+
+        if num_pages < PARALLEL_PDF_THRESHOLD:
+            return "\n".join((page.extract_text() or "") for page in reader.pages)
+
+    max_workers = min(8, os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pages = executor.map(
+            _extract_pdf_page, [(file_location, i) for i in range(num_pages)]
+        )
+        return "\n".join(pages)
+
 def validate_file(file: UploadFile) -> None:
     """Validate file size and type"""
     if not file.filename:
@@ -41,101 +68,94 @@ def validate_file(file: UploadFile) -> None:
     # Reset file pointer
     file.file.seek(0)
 
-async def process_file(file: UploadFile, upload_folder: str) -> dict:
-    """Process a single file and return results"""
+async def save_upload(file: UploadFile, upload_folder: str) -> str:
+    """Validate an upload and write it to disk, returning its location"""
+    validate_file(file)
+
+    # Create upload directory if it doesn't exist
+    os.makedirs(upload_folder, exist_ok=True)
+
+    # Save file
+    file_location = os.path.join(upload_folder, file.filename)
     try:
-        logger.info(f"Starting to process file: {file.filename}")
-        validate_file(file)
-        
-        # Create upload directory if it doesn't exist
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Save file
-        file_location = os.path.join(upload_folder, file.filename)
-        try:
-            contents = await file.read()
-            with open(file_location, "wb") as buffer:
-                buffer.write(contents)
-            logger.info(f"File saved successfully at: {file_location}")
-        finally:
-            await file.close()
-        
+        contents = await file.read()
+        with open(file_location, "wb") as buffer:
+            buffer.write(contents)
+        logger.info(f"File saved successfully at: {file_location}")
+    finally:
+        await file.close()
+
+    return file_location
+
+def process_file_sync(file_location: str, filename: str) -> dict:
+    """Extract, chunk and save text for a saved file (runs in a worker thread)"""
+    try:
+        logger.info(f"Starting to process file: {filename}")
+
         # Extract text based on file type
         extracted_text = ""
-        ext = os.path.splitext(file.filename)[1].lower()
-        
+        ext = os.path.splitext(filename)[1].lower()
+
         try:
             if ext == ".pdf":
-                logger.info(f"Processing PDF file: {file.filename}")
-                with open(file_location, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page in reader.pages:
-                        extracted_text += page.extract_text() + "\n"
+                logger.info(f"Processing PDF file: {filename}")
+                extracted_text = extract_pdf_text(file_location)
             elif ext == ".txt":
-                logger.info(f"Processing text file: {file.filename}")
+                logger.info(f"Processing text file: {filename}")
                 with open(file_location, "r", encoding="utf-8") as f:
                     extracted_text = f.read()
             else:  # For other file types, use OCR
-                logger.info(f"Processing file with OCR: {file.filename}")
+                logger.info(f"Processing file with OCR: {filename}")
                 extracted_text = extract_text_from_file(file_location)
                 if not extracted_text.strip():
                     raise FileProcessingError("OCR failed to extract text from the image")
-            
+
             logger.info(f"Extracted text length: {len(extracted_text)} characters")
         except Exception as e:
-            logger.error(f"Error extracting text from {file.filename}: {str(e)}")
+            logger.error(f"Error extracting text from {filename}: {str(e)}")
             raise FileProcessingError(f"Failed to extract text: {str(e)}")
 
         # Chunk the extracted text
         try:
-            logger.info(f"Starting text chunking for: {file.filename}")
-            chunks = chunk_text(extracted_text, doc_name=file.filename)
+            logger.info(f"Starting text chunking for: {filename}")
+            chunks = chunk_text(extracted_text, doc_name=filename)
             if not chunks:
                 raise FileProcessingError("No text chunks generated")
             logger.info(f"Generated {len(chunks)} chunks")
         except Exception as e:
-            logger.error(f"Error chunking text from {file.filename}: {str(e)}")
+            logger.error(f"Error chunking text from {filename}: {str(e)}")
             raise FileProcessingError(f"Failed to chunk text: {str(e)}")
 
-        # Create FAISS index and save it
-        try:
-            logger.info(f"Creating FAISS index for: {file.filename}")
-            index = create_faiss_index(chunks)
-            save_index(index, chunks)
-            logger.info("FAISS index created and saved successfully")
-        except Exception as e:
-            logger.error(f"Error creating index for {file.filename}: {str(e)}")
-            raise FileProcessingError(f"Failed to create search index: {str(e)}")
-
         # Save the extracted text
         try:
             os.makedirs(PROCESSED_TEXT_DIR, exist_ok=True)
-            text_file_path = os.path.join(PROCESSED_TEXT_DIR, os.path.splitext(file.filename)[0] + ".txt")
+            text_file_path = os.path.join(PROCESSED_TEXT_DIR, os.path.splitext(filename)[0] + ".txt")
             with open(text_file_path, "w", encoding="utf-8") as text_file:
                 text_file.write(extracted_text)
             logger.info(f"Processed text saved to: {text_file_path}")
         except Exception as e:
-            logger.error(f"Error saving processed text for {file.filename}: {str(e)}")
+            logger.error(f"Error saving processed text for {filename}: {str(e)}")
             raise FileProcessingError(f"Failed to save processed text: {str(e)}")
 
         return {
-            "filename": file.filename,
+            "filename": filename,
             "status": "success",
+            "chunks": chunks,
             "num_chunks": len(chunks),
             "extracted_text_preview": extracted_text[:500]
         }
 
     except FileProcessingError as e:
-        logger.error(f"File processing error for {file.filename}: {str(e)}")
+        logger.error(f"File processing error for {filename}: {str(e)}")
         return {
-            "filename": file.filename,
+            "filename": filename,
             "status": "error",
             "error": str(e)
         }
     except Exception as e:
-        logger.error(f"Unexpected error processing {file.filename}: {str(e)}")
+        logger.error(f"Unexpected error processing {filename}: {str(e)}")
         return {
-            "filename": file.filename,
+            "filename": filename,
             "status": "error",
             "error": "An unexpected error occurred during processing"
         }
@@ -145,12 +165,44 @@ async def upload_files(files: List[UploadFile] = File(...)):
     """Upload and process multiple files"""
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
-    
+
+    # Save all uploads to disk first (disk-bound, sequential is fine)
+    saved = []
     results = []
     for file in files:
-        result = await process_file(file, UPLOAD_DIR)
+        try:
+            file_location = await save_upload(file, UPLOAD_DIR)
+            saved.append((file_location, file.filename))
+        except HTTPException as e:
+            results.append({
+                "filename": file.filename,
+                "status": "error",
+                "error": e.detail
+            })
+
+    # Extract and chunk all saved files in parallel worker threads
+    processed = await asyncio.gather(
+        *(asyncio.to_thread(process_file_sync, location, filename)
+          for location, filename in saved)
+    )
+
+    # Index serially to avoid concurrent FAISS mutation, but in a worker
+    # thread: embedding the new chunks dominates upload time and would
+    # otherwise stall every other request on the event loop
+    for result in processed:
+        chunks = result.pop("chunks", None)
+        if result["status"] == "success":
+            try:
+                logger.info(f"Indexing chunks for: {result['filename']}")
+                await asyncio.to_thread(add_to_index, chunks)
+            except Exception as e:
+                logger.error(f"Error indexing {result['filename']}: {str(e)}")
+                result.update({
+                    "status": "error",
+                    "error": f"Failed to update search index: {str(e)}"
+                })
         results.append(result)
-    
+
     # Check if any files were processed successfully
     successful_uploads = [r for r in results if r["status"] == "success"]
     if not successful_uploads:
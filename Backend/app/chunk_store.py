@@ -0,0 +1,87 @@
+class ChunkStore:
+    """Column-oriented (struct-of-arrays) storage for text chunks.
+
+    Instead of a list of per-chunk dicts, each field lives in its own
+    contiguous list. Bulk operations (embedding all texts, building the
+    results table) read one column straight through, and the pickled
+    payload is much smaller because field names are stored once.
+    Row access via indexing still returns a plain dict so existing
+    call sites keep working.
+    """
+
+    COLUMNS = ("chunk_text", "document", "page", "paragraph", "sentence",
+               "citation", "preview")
+
+    def __init__(self, columns=None):
+        if columns is None:
+            self._columns = {name: [] for name in self.COLUMNS}
+            return
+
+        self._columns = {
+            name: list(columns[name]) for name in self.COLUMNS if name in columns
+        }
+        # Files written before citation/preview were stored lack those
+        # columns; derive them once on load
+        if "citation" not in self._columns:
+            self._columns["citation"] = [
+                self.make_citation(page, para, sent)
+                for page, para, sent in zip(
+                    self._columns["page"],
+                    self._columns["paragraph"],
+                    self._columns["sentence"],
+                )
+            ]
+        if "preview" not in self._columns:
+            self._columns["preview"] = [
+                self.make_preview(text) for text in self._columns["chunk_text"]
+            ]
+
+    @staticmethod
+    def make_citation(page, paragraph, sentence):
+        """Render the citation string shown in result tables"""
+        return f"Page {page}, Para {paragraph}, Sent {sentence}"
+
+    @staticmethod
+    def make_preview(chunk_text):
+        """Render the truncated text shown in result tables"""
+        return chunk_text[:300] + ("..." if len(chunk_text) > 300 else "")
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a store from an iterable of per-chunk dicts"""
+        store = cls()
+        for record in records:
+            store.append(record)
+        return store
+
+    def append(self, record):
+        """Append a single chunk record (dict with one value per column)"""
+        for name in self.COLUMNS:
+            if name in record:
+                value = record[name]
+            elif name == "citation":
+                value = self.make_citation(
+                    record["page"], record["paragraph"], record["sentence"]
+                )
+            else:  # preview
+                value = self.make_preview(record["chunk_text"])
+            self._columns[name].append(value)
+
+    def extend(self, other):
+        """Append all chunks from another ChunkStore"""
+        for name in self.COLUMNS:
+            self._columns[name].extend(other.column(name))
+
+    def column(self, name):
+        """Return the full column for bulk access"""
+        return self._columns[name]
+
+    def __len__(self):
+        return len(self._columns["chunk_text"])
+
+    def __getitem__(self, idx):
+        return {name: self._columns[name][idx] for name in self.COLUMNS}
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
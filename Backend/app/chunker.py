@@ -1,15 +1,21 @@
 import os
 import re
 
+from app.chunk_store import ChunkStore
+
+# Compile the sentence-boundary pattern once instead of per paragraph
+_SENT_RE = re.compile(r'(?<=[.!?]) +')
+
 def chunk_text(extracted_text, doc_name="Unknown Document", page_num=1):
     # Split into paragraphs first
     paragraphs = [p.strip() for p in extracted_text.split("\n\n") if p.strip()]
-    chunks = []
-    
+    chunks = ChunkStore()
+
     # Process each paragraph
     for para_idx, paragraph in enumerate(paragraphs, start=1):
         # If paragraph is short, keep it as one chunk
-        if len(paragraph.split()) < 50:
+        # count(' ') + 1 approximates the word count without allocating a list
+        if paragraph.count(' ') + 1 < 50:
             chunks.append({
                 "chunk_text": paragraph,
                 "document": doc_name,
@@ -20,7 +26,7 @@ def chunk_text(extracted_text, doc_name="Unknown Document", page_num=1):
             continue
             
         # For longer paragraphs, split into sentences but keep more context
-        sentences = re.split(r'(?<=[.!?]) +', paragraph)
+        sentences = _SENT_RE.split(paragraph)
         current_chunk = []
         current_length = 0
         
@@ -31,7 +37,7 @@ def chunk_text(extracted_text, doc_name="Unknown Document", page_num=1):
                 
             # Add sentence to current chunk
             current_chunk.append(sentence)
-            current_length += len(sentence.split())
+            current_length += sentence.count(' ') + 1
             
             # If chunk is long enough or this is the last sentence, save it
             if current_length >= 100 or sent_idx == len(sentences):
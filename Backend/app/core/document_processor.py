@@ -1,6 +1,7 @@
 from typing import List, Dict, Optional
 import os
 from pathlib import Path
+import numpy as np
 import pytesseract
 from pdf2image import convert_from_path
 from pypdf import PdfReader
@@ -8,6 +9,34 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import TextLoader, PDFLoader
 from langchain.schema import Document
 
+# Optional GPU-accelerated OCR backend; Tesseract stays the fallback
+try:
+    import easyocr
+except ImportError:
+    easyocr = None
+
+_ocr_reader = None
+
+def _get_ocr_reader():
+    """Lazily create the shared EasyOCR reader (None when unavailable)"""
+    global _ocr_reader
+    if easyocr is not None and _ocr_reader is None:
+        _ocr_reader = easyocr.Reader(['en'], gpu=True)
+    return _ocr_reader
+
+def _ocr_images(images) -> List[str]:
+    """OCR a batch of page images, on GPU when easyocr is installed"""
+    reader = _get_ocr_reader()
+    if reader is not None:
+        return [
+            "\n".join(reader.readtext(
+                np.array(image), detail=0, paragraph=True, batch_size=8
+            ))
+            for image in images
+        ]
+    # Serial CPU fallback
+    return [pytesseract.image_to_string(image) for image in images]
+
 class DocumentProcessor:
     def __init__(self, upload_dir: str):
         self.upload_dir = Path(upload_dir)
@@ -36,19 +65,26 @@ class DocumentProcessor:
         """Process PDF files with OCR for scanned pages."""
         documents = []
         pdf = PdfReader(str(file_path))
-        
-        for page_num, page in enumerate(pdf.pages):
-            text = page.extract_text()
-            
-            # If no text is extracted, the page might be scanned
-            if not text.strip():
-                # Convert PDF page to image and perform OCR
-                images = convert_from_path(str(file_path), first_page=page_num+1, last_page=page_num+1)
-                text = pytesseract.image_to_string(images[0])
-            
+
+        # First pass: pull the embedded text from every page
+        page_texts = [page.extract_text() or "" for page in pdf.pages]
+
+        # Pages with no extractable text are likely scans; render them and
+        # OCR the whole batch together instead of once per page
+        scanned = [i for i, text in enumerate(page_texts) if not text.strip()]
+        if scanned:
+            images = []
+            for i in scanned:
+                images.extend(
+                    convert_from_path(str(file_path), first_page=i+1, last_page=i+1)
+                )
+            for i, text in zip(scanned, _ocr_images(images)):
+                page_texts[i] = text
+
+        for page_num, text in enumerate(page_texts):
             # Split text into chunks
             chunks = self.text_splitter.split_text(text)
-            
+
             # Create Document objects with metadata
             for chunk_num, chunk in enumerate(chunks):
                 doc = Document(
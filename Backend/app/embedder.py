@@ -1,33 +1,79 @@
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import pickle
 import os
 import logging
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.chunk_store import ChunkStore
+from app.models import get_embedder, encode_length_sorted
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load the embedding model 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+def _new_index(dim):
+    """Create an empty HNSW index for sub-linear approximate search"""
+    # HNSW gives log-scale search time at high recall and, unlike IVF,
+    # needs no training step so chunks can be added incrementally.
+    # Vectors are unit-normalized, so inner product equals cosine
+    index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = 80
+    index.hnsw.efSearch = 64
+    return index
+
+# Opt-in 4-bit product quantization needs enough vectors to train its
+# codebooks; below this count the HNSW index is used regardless
+PQ_FASTSCAN_MIN_VECTORS = 50_000
+
+def _build_index(embeddings):
+    """Create an index sized for the given vectors, wrapped in an ID map"""
+    dim = embeddings.shape[1]
+    if (os.getenv("FAISS_INDEX_TYPE") == "pq_fastscan"
+            and embeddings.shape[0] > PQ_FASTSCAN_MIN_VECTORS):
+        # 4-bit PQ codes are 8x smaller than flat storage and are scanned
+        # with SIMD lookup tables. dim must be a multiple of M; dividing
+        # by 8 gives M=48 for MiniLM's 384 dims.
+        M = dim // 8
+        logger.info(f"Building IndexPQFastScan (M={M}, 4-bit)")
+        index = faiss.IndexPQFastScan(dim, M, 4, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    else:
+        index = _new_index(dim)
+    return faiss.IndexIDMap2(index)
+
+def _encode_chunks(chunks):
+    """Embed chunk texts into a contiguous float32 matrix"""
+    texts = chunks.column("chunk_text")
+    logger.info(f"Embedding {len(texts)} text chunks")
+
+    # Generate normalized embeddings in large, length-sorted batches
+    embeddings = encode_length_sorted(
+        get_embedder(),
+        texts,
+        batch_size=128,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    # FAISS expects contiguous float32 regardless of inference precision
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    logger.info(f"Generated embeddings with shape: {embeddings.shape}")
+    return embeddings
 
 def embed_text_chunks(chunks):
     """Embed text chunks and create FAISS index"""
     try:
-        # Extract text from chunk dictionaries
-        texts = [chunk["chunk_text"] for chunk in chunks]
-        logger.info(f"Embedding {len(texts)} text chunks")
-        
-        # Generate embeddings
-        embeddings = model.encode(texts, show_progress_bar=True)
-        logger.info(f"Generated embeddings with shape: {embeddings.shape}")
-        
-        # Create and populate FAISS index
-        index = faiss.IndexFlatL2(embeddings.shape[1])
-        index.add(np.array(embeddings))
+        embeddings = _encode_chunks(chunks)
+
+        # Create and populate FAISS index keyed by chunk position
+        index = _build_index(embeddings)
+        ids = np.arange(len(chunks), dtype=np.int64)
+        index.add_with_ids(embeddings, ids)
         logger.info("FAISS index created and populated")
-        
+
         return index, embeddings
     except Exception as e:
         logger.error(f"Error in embed_text_chunks: {str(e)}")
@@ -35,37 +81,62 @@ def embed_text_chunks(chunks):
 
 # Save and load the FAISS index and chunks
 INDEX_PATH = "faiss_index.index"
-CHUNKS_PATH = "chunks.pkl"
+CHUNKS_PATH = "chunks.parquet"
+LEGACY_CHUNKS_PATH = "chunks.pkl"
 
 def save_index(index, chunks):
     """Save FAISS index and chunks to disk"""
     try:
         logger.info(f"Saving FAISS index to {INDEX_PATH}")
         faiss.write_index(index, INDEX_PATH)
-        
+
         logger.info(f"Saving chunks to {CHUNKS_PATH}")
-        with open(CHUNKS_PATH, "wb") as f:
-            pickle.dump(chunks, f)
-        
+        table = pa.Table.from_pydict(
+            {name: chunks.column(name) for name in ChunkStore.COLUMNS}
+        )
+        pq.write_table(table, CHUNKS_PATH)
+
         logger.info("Successfully saved index and chunks")
     except Exception as e:
         logger.error(f"Error saving index and chunks: {str(e)}")
         raise
 
+def _load_chunks():
+    """Load the chunk store, falling back to the old pickle format"""
+    if os.path.exists(CHUNKS_PATH):
+        logger.info(f"Loading chunks from {CHUNKS_PATH}")
+        # Memory-mapping lets worker processes share the OS page cache
+        # instead of each deserializing its own copy of the file
+        table = pq.read_table(pa.memory_map(CHUNKS_PATH))
+        return ChunkStore(table.to_pydict())
+
+    if os.path.exists(LEGACY_CHUNKS_PATH):
+        logger.info(f"Loading chunks from legacy {LEGACY_CHUNKS_PATH}")
+        with open(LEGACY_CHUNKS_PATH, "rb") as f:
+            chunks = pickle.load(f)
+        # Chunk files written before the column-oriented store were a
+        # plain list of dicts; convert them on load
+        if isinstance(chunks, list):
+            chunks = ChunkStore.from_records(chunks)
+        return chunks
+
+    return None
+
 def load_index_and_chunks():
     """Load FAISS index and chunks from disk"""
     try:
-        if not os.path.exists(INDEX_PATH) or not os.path.exists(CHUNKS_PATH):
-            logger.warning("Index or chunks file not found")
+        if not os.path.exists(INDEX_PATH):
+            logger.warning("Index file not found")
             return None, None
-            
+
         logger.info(f"Loading FAISS index from {INDEX_PATH}")
         index = faiss.read_index(INDEX_PATH)
-        
-        logger.info(f"Loading chunks from {CHUNKS_PATH}")
-        with open(CHUNKS_PATH, "rb") as f:
-            chunks = pickle.load(f)
-            
+
+        chunks = _load_chunks()
+        if chunks is None:
+            logger.warning("Chunks file not found")
+            return None, None
+
         logger.info("Successfully loaded index and chunks")
         return index, chunks
     except Exception as e:
@@ -81,3 +152,31 @@ def create_faiss_index(chunks):
     except Exception as e:
         logger.error(f"Error creating FAISS index: {str(e)}")
         raise
+
+def add_to_index(new_chunks):
+    """Append new chunks to the persistent index instead of rebuilding it"""
+    try:
+        index, chunks = load_index_and_chunks()
+        if index is None or chunks is None:
+            index, chunks = None, ChunkStore()
+
+        embeddings = _encode_chunks(new_chunks)
+        ids = np.arange(len(chunks), len(chunks) + len(new_chunks), dtype=np.int64)
+
+        if index is None:
+            index = _build_index(embeddings)
+
+        chunks.extend(new_chunks)
+        try:
+            index.add_with_ids(embeddings, ids)
+        except RuntimeError:
+            # Index saved by an older version without an ID map: rebuild once
+            logger.warning("Existing index does not support add_with_ids, rebuilding")
+            index, _ = embed_text_chunks(chunks)
+
+        save_index(index, chunks)
+        logger.info(f"Added {len(new_chunks)} chunks to index ({len(chunks)} total)")
+        return index, chunks
+    except Exception as e:
+        logger.error(f"Error adding chunks to index: {str(e)}")
+        raise
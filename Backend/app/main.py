@@ -1,13 +1,22 @@
+import os
+
+import faiss
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api import upload
 from app.api import query
 from app.api import query_results
+from app.models import get_embedder
+from app.services import batched_embedder
 
 app = FastAPI(
     title="Document Research & Theme Identification Chatbot",
     description="API for document processing, theme identification, and question answering",
-    version="1.0.0"
+    version="1.0.0",
+    # Serialize responses with orjson; chunk-heavy query payloads are
+    # several times faster to encode than with stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -23,6 +32,20 @@ app.include_router(upload.router)
 app.include_router(query.router)
 app.include_router(query_results.router)
 
+@app.on_event("startup")
+async def warm_up_model():
+    # Leave half the cores for the request worker threads so FAISS's
+    # OpenMP pool doesn't fight them
+    faiss.omp_set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+    # Load the shared embedding model and run one dummy encode before the
+    # first request arrives: torch.compile captures its graph lazily on
+    # the first forward pass, so without this the multi-second compile
+    # would land on the first user query
+    model = get_embedder()
+    model.encode(["warm-up"], convert_to_numpy=True, normalize_embeddings=True)
+    # Coalesce concurrent encode calls into shared forward passes
+    batched_embedder.start()
+
 @app.get("/")
 async def root():
     return {
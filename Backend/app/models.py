@@ -0,0 +1,65 @@
+import threading
+import logging
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_embedder(model_name: str = 'all-MiniLM-L6-v2') -> SentenceTransformer:
+    """Return the process-wide shared SentenceTransformer instance.
+
+    The model is ~90 MB of weights; loading one copy per module tripled
+    memory use and cold-start time. The first caller loads it (double-
+    checked under a lock), everyone else gets the same instance.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                logger.info(f"Loading embedding model '{model_name}' on {device}")
+                model = SentenceTransformer(model_name, device=device)
+                if device == 'cuda':
+                    model.half()
+                model.max_seq_length = 256
+                model.eval()
+                _compile_transformer(model)
+                _model = model
+    return _model
+
+def encode_length_sorted(model: SentenceTransformer, texts, **encode_kwargs) -> np.ndarray:
+    """Encode texts grouped by length to cut padding waste.
+
+    Every batch is padded to its longest member, so mixed-length batches
+    spend FLOPs on padding tokens. Sorting longest-first packs similar
+    lengths together; the permutation is inverted afterwards so rows come
+    back in input order.
+    """
+    if len(texts) < 2:
+        return model.encode(texts, **encode_kwargs)
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    embeddings = model.encode([texts[i] for i in order], **encode_kwargs)
+    return embeddings[np.argsort(order)]
+
+def _compile_transformer(model: SentenceTransformer) -> None:
+    """Fuse the underlying transformer's kernels with torch.compile.
+
+    Graph capture removes per-op Python dispatch from every forward
+    pass. encode() itself is plain Python, so the compiled module is
+    the HuggingFace transformer inside the first pipeline stage.
+    """
+    if not hasattr(torch, 'compile'):
+        return
+    try:
+        model[0].auto_model = torch.compile(
+            model[0].auto_model, mode='reduce-overhead', fullgraph=False
+        )
+        logger.info("Compiled embedding model with torch.compile")
+    except Exception as e:
+        # Compilation is an optimization only; fall back to eager mode
+        logger.warning(f"torch.compile unavailable, running eager: {e}")
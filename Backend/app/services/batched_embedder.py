@@ -0,0 +1,86 @@
+import asyncio
+import logging
+
+import numpy as np
+
+from app.models import get_embedder
+
+logger = logging.getLogger(__name__)
+
+# How long the worker waits for more texts before encoding, and the
+# largest batch it will hand to the model in one forward pass
+MAX_WAIT_MS = 10
+MAX_BATCH = 32
+
+_queue = None
+_worker_task = None
+
+def start() -> None:
+    """Start the background batching worker (called from app startup)"""
+    global _queue, _worker_task
+    if _worker_task is None:
+        _queue = asyncio.Queue()
+        _worker_task = asyncio.create_task(_worker())
+        logger.info("Started micro-batching embedder worker")
+
+async def encode(text: str) -> np.ndarray:
+    """Encode one text, transparently batched with concurrent callers.
+
+    Pending texts are collected for up to MAX_WAIT_MS and encoded in a
+    single forward pass, so N concurrent requests cost one batch of N
+    instead of N single-text model calls.
+    """
+    if _queue is None:
+        # Worker not running (e.g. scripts outside the app); encode directly
+        emb = await asyncio.to_thread(
+            get_embedder().encode, [text],
+            convert_to_numpy=True, normalize_embeddings=True
+        )
+        return np.ascontiguousarray(emb[0], dtype=np.float32)
+
+    fut = asyncio.get_running_loop().create_future()
+    await _queue.put((text, fut))
+    return await fut
+
+async def encode_many(texts) -> np.ndarray:
+    """Encode several texts through the shared batching queue"""
+    embeddings = await asyncio.gather(*(encode(text) for text in texts))
+    return np.stack(embeddings)
+
+async def _drain():
+    """Take one pending text, then gather more for up to MAX_WAIT_MS"""
+    batch = [await _queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + MAX_WAIT_MS / 1000.0
+
+    while len(batch) < MAX_BATCH:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(_queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+async def _worker():
+    model = get_embedder()
+    while True:
+        batch = await _drain()
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = await asyncio.to_thread(
+                model.encode, texts, batch_size=MAX_BATCH,
+                convert_to_numpy=True, normalize_embeddings=True
+            )
+        except Exception as e:
+            logger.error(f"Error encoding batch of {len(texts)}: {str(e)}")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        for (_, fut), emb in zip(batch, embeddings):
+            if not fut.done():
+                fut.set_result(emb)
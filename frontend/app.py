@@ -3,9 +3,10 @@ import requests
 from pathlib import Path
 import os
 from dotenv import load_dotenv
-import json
+import orjson
 from typing import Dict, Any
 import pandas as pd
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 
 # Load environment variables
 load_dotenv()
@@ -29,10 +30,18 @@ def upload_files(files):
         return None
 
     try:
-        files_to_upload = [("files", file) for file in files]
-        response = requests.post(f"{BACKEND_URL}/upload", files=files_to_upload)
+        # Stream the multipart body straight from the file handles so
+        # requests never buffers a second copy of every file in memory
+        encoder = MultipartEncoder(
+            fields=[("files", (file.name, file, file.type)) for file in files]
+        )
+        response = requests.post(
+            f"{BACKEND_URL}/upload",
+            data=encoder,
+            headers={"Content-Type": encoder.content_type}
+        )
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except requests.exceptions.ConnectionError:
         display_error("Could not connect to the backend server. Please make sure it's running.")
         return None
@@ -76,17 +85,20 @@ def display_upload_results(result):
 def search_documents(query: str, top_k: int = 5, min_relevance: float = 0.3) -> Dict[str, Any]:
     """Search documents using the backend API"""
     try:
+        # orjson serializes/parses at C speed; result payloads with top_k
+        # chunks plus contexts are large enough for stdlib json to show up
         response = requests.post(
             f"{BACKEND_URL}/query",
-            json={
+            data=orjson.dumps({
                 "query": query,
                 "top_k": top_k,
                 "min_relevance_score": min_relevance,
                 "include_context": True
-            }
+            }),
+            headers={"Content-Type": "application/json"}
         )
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except requests.exceptions.RequestException as e:
         try:
             error_detail = e.response.json().get('detail', str(e))